@@ -15,7 +15,8 @@ Example:
 import os
 import re
 import sys
-import copy
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
@@ -23,8 +24,12 @@ from dataclasses import dataclass, field
 from pptx import Presentation
 from pptx.util import Inches, Pt, Emu
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.dml import MSO_COLOR_TYPE
 from pptx.dml.color import RGBColor
-from PIL import Image
+from pptx.oxml.ns import qn
+from lxml.etree import SubElement
+from PIL import Image, UnidentifiedImageError
 
 
 # ============================================
@@ -73,6 +78,28 @@ COLORS = {
     "source": RGBColor(0x66, 0x66, 0x66),     # 浅灰
 }
 
+# 解析用正则（模块加载时编译一次，避免逐行查 re 的缓存）
+_RE_BULLET1_HEAD = re.compile(r"^▶\s*\*\*[\d.]+\s*")   # "▶ **1. " 前缀
+_RE_BULLET1_TAIL = re.compile(r"\*\*$")                 # 结尾的 **
+_RE_BULLET2_HEAD = re.compile(r"^▢\s*[\d.]+\s*")        # "▢ 1.1 " 前缀
+_RE_BOLD = re.compile(r"\*\*(.+?)\*\*")                  # **粗体**
+_RE_CONTENT_ONLY = re.compile(r"\s*\[content-only\]", re.IGNORECASE)
+
+# parse_markdown 按行首字符给每行归类，只在对应类别里做 startswith 检查
+_TAG_OTHER, _TAG_HASH, _TAG_STAR, _TAG_DASH, _TAG_BULLET1, _TAG_BULLET2 = range(6)
+_LINE_TAGS = {"#": _TAG_HASH, "*": _TAG_STAR, "-": _TAG_DASH, "▶": _TAG_BULLET1, "▢": _TAG_BULLET2}
+# 配图 / 讲稿段落标记（中英文写法），供 startswith 一次匹配
+_FIGURES_HEADERS = ("**配图**:", "**Figures**:")
+_NOTES_HEADERS = ("**讲稿**:", "**Notes**:")
+
+# 可作为配图的文件扩展名（小写、不含点），以及读取时只需尝试的 PIL 格式
+_IMAGE_EXTS = {"png", "jpg", "jpeg"}
+_IMAGE_FORMATS = ("PNG", "JPEG")
+
+# 查找配图时去掉括号 / 分隔符（一次 translate 代替连续几次 replace）
+_STRIP_PARENS = str.maketrans("", "", "()")
+_STRIP_SEPS = str.maketrans("", "", "_-")
+
 
 # ============================================
 # 数据结构
@@ -103,13 +130,32 @@ class PresentationData:
     slides: List[SlideContent] = field(default_factory=list)
 
 
+@dataclass
+class ShapeCopy:
+    """模板形状的复制计划：从模板读取一次，之后每张新幻灯片照此添加"""
+    kind: str  # "picture" / "line" / "autoshape" / "textbox"
+    left: int
+    top: int
+    width: int
+    height: int
+    blob: bytes = b""                                # picture: 图片数据
+    ends: Optional[Tuple[int, int, int, int]] = None  # line: 起点、终点坐标
+    auto_shape_type: Optional[int] = None            # autoshape
+    fill_type: Optional[int] = None
+    fill_rgb: Optional[RGBColor] = None
+    line_rgb: Optional[RGBColor] = None
+    line_width: int = 0
+    # textbox: [(alignment, level, [(text, name, size, bold, italic, rgb), ...]), ...]
+    paragraphs: list = field(default_factory=list)
+
+
 # ============================================
 # 解析 ppt_content.md
 # ============================================
 
 def parse_markdown(content: str) -> PresentationData:
     """解析 ppt_content.md 文件"""
-    lines = content.split("\n")
+    lines = content.splitlines()
     result = PresentationData()
     
     current_slide: Optional[SlideContent] = None
@@ -118,35 +164,43 @@ def parse_markdown(content: str) -> PresentationData:
     in_figures = False
     
     for line in lines:
+        # 讲稿正文（通常占大半篇幅）：行首既非空白也非标记字符时，
+        # 后面的判断都不会命中，直接收集，省去 strip
+        if in_notes and line[:1] not in _LINE_TAGS and not line[:1].isspace():
+            notes_buffer.append(line)
+            continue
+        
         trimmed = line.strip()
+        tag = _LINE_TAGS.get(trimmed[:1], _TAG_OTHER)
         
-        # 解析标题（第一个 # 开头）
-        if not result.title and trimmed.startswith("# "):
-            result.title = trimmed[2:].strip()
-            continue
+        if tag == _TAG_HASH:
+            # 解析标题（第一个 # 开头）
+            if not result.title and trimmed.startswith("# "):
+                result.title = trimmed[2:].strip()
+                continue
+            
+            # 新幻灯片开始
+            if trimmed.startswith("## Slide"):
+                if current_slide:
+                    if notes_buffer:
+                        current_slide.notes = "\n".join(notes_buffer).strip()
+                    result.slides.append(current_slide)
+                current_slide = SlideContent()
+                in_notes = False
+                in_figures = False
+                notes_buffer.clear()
+                continue
         
         # 解析来源（*...* 格式）
-        if not result.source and trimmed.startswith("*") and trimmed.endswith("*"):
+        elif tag == _TAG_STAR and not result.source and trimmed.endswith("*"):
             result.source = trimmed[1:-1].strip()
             continue
         
-        # 新幻灯片开始
-        if trimmed.startswith("## Slide"):
-            if current_slide:
-                if notes_buffer:
-                    current_slide.notes = "\n".join(notes_buffer).strip()
-                result.slides.append(current_slide)
-            current_slide = SlideContent()
-            in_notes = False
-            in_figures = False
-            notes_buffer = []
-            continue
-        
         if not current_slide:
             continue
         
         # 解析配图（多行格式）
-        if trimmed.startswith("**配图**:") or trimmed.startswith("**Figures**:"):
+        if tag == _TAG_STAR and trimmed.startswith(_FIGURES_HEADERS):
             in_figures = True
             in_notes = False
             # 检查同一行是否有内容
@@ -157,21 +211,22 @@ def parse_markdown(content: str) -> PresentationData:
                 in_figures = False
             continue
         
-        # 解析配图列表项
-        if in_figures and trimmed.startswith("- "):
-            fig_text = trimmed[2:].strip()
-            # 移除注释
-            if "#" in fig_text:
-                fig_text = fig_text.split("#")[0].strip()
-            parse_figure_line(fig_text, current_slide)
-            continue
-        
-        # 配图区域结束
-        if in_figures and trimmed and not trimmed.startswith("-"):
-            in_figures = False
+        if in_figures:
+            if tag == _TAG_DASH:
+                # 解析配图列表项
+                if trimmed.startswith("- "):
+                    fig_text = trimmed[2:].strip()
+                    # 移除注释
+                    if "#" in fig_text:
+                        fig_text = fig_text.split("#")[0].strip()
+                    parse_figure_line(fig_text, current_slide)
+                    continue
+            elif trimmed:
+                # 配图区域结束
+                in_figures = False
         
         # 解析讲稿
-        if trimmed.startswith("**讲稿**:") or trimmed.startswith("**Notes**:"):
+        if tag == _TAG_STAR and trimmed.startswith(_NOTES_HEADERS):
             in_notes = True
             in_figures = False
             rest = trimmed.split(":", 1)[1].strip() if ":" in trimmed else ""
@@ -191,26 +246,23 @@ def parse_markdown(content: str) -> PresentationData:
             continue
         
         # 解析一级大纲 ▶
-        if trimmed.startswith("▶"):
+        if tag == _TAG_BULLET1:
             in_figures = False
             # 提取文本，移除 **数字. 和结尾的 **
-            text = re.sub(r"^▶\s*\*\*[\d.]+\s*", "", trimmed)
-            text = re.sub(r"\*\*$", "", text).strip()
+            text = _RE_BULLET1_HEAD.sub("", trimmed)
+            text = _RE_BULLET1_TAIL.sub("", text).strip()
             current_slide.bullets.append(BulletItem(level=1, text=text, is_bold=True))
-            continue
         
         # 解析二级大纲 ▢
-        if trimmed.startswith("▢"):
+        elif tag == _TAG_BULLET2:
             in_figures = False
-            text = re.sub(r"^▢\s*[\d.]+\s*", "", trimmed).strip()
+            text = _RE_BULLET2_HEAD.sub("", trimmed).strip()
             current_slide.bullets.append(BulletItem(level=2, text=text))
-            continue
         
         # 解析三级内容（- 开头，但不在配图区域）
-        if trimmed.startswith("- ") and not in_figures and current_slide.bullets:
+        elif tag == _TAG_DASH and trimmed.startswith("- ") and not in_figures and current_slide.bullets:
             text = trimmed[2:].strip()
             current_slide.bullets.append(BulletItem(level=3, text=text))
-            continue
     
     # 添加最后一个幻灯片
     if current_slide:
@@ -231,7 +283,7 @@ def parse_figure_line(text: str, slide: SlideContent):
         # 检查是否有 [content-only] 标记
         content_only = "[content-only]" in part.lower()
         # 提取图片名称
-        fig_name = re.sub(r"\s*\[content-only\]", "", part, flags=re.IGNORECASE).strip()
+        fig_name = _RE_CONTENT_ONLY.sub("", part).strip()
         if fig_name:
             slide.figures.append(fig_name)
             slide.figure_modes.append(content_only)
@@ -241,19 +293,47 @@ def parse_figure_line(text: str, slide: SlideContent):
 # 图片处理
 # ============================================
 
-def find_figure_file(figures_dir: str, figure_name: str) -> Optional[str]:
-    """查找图片文件
+def build_figure_index(figures_dir: str) -> Dict[str, Tuple[str, str, str]]:
+    """扫描一次图片目录，供 find_figure_file 反复查找
+
+    Returns:
+        {文件名: (路径, 小写文件名, 去掉 _ 和 - 的小写文件名)}，只收录 png/jpg/jpeg，保持目录顺序
+    """
+    index: Dict[str, Tuple[str, str, str]] = {}
+    if not figures_dir:
+        return index
+    # 目录不存在/不是目录时 scandir 抛 OSError，不必先 isdir 多一次 stat
+    try:
+        with os.scandir(figures_dir) as entries:
+            for entry in entries:
+                # 先按扩展名筛掉非图片（纯字符串操作），".png" 这类隐藏文件不算
+                stem, _, ext = entry.name.rpartition(".")
+                if not stem or ext.lower() not in _IMAGE_EXTS:
+                    continue
+                # DirEntry 缓存了类型信息，通常无需再 stat；软链接仍跟随
+                if not entry.is_file():
+                    continue
+                name_lower = entry.name.lower()
+                index[entry.name] = (entry.path, name_lower, name_lower.translate(_STRIP_SEPS))
+    except OSError:
+        pass
+    return index
+
+
+def find_figure_file(index: Dict[str, Tuple[str, str, str]], figure_name: str) -> Optional[str]:
+    """在 build_figure_index 建立的索引中查找图片文件
     
     支持多种命名格式：
     - Figure_1.png (空格转下划线)
     - <pdf_name>_Figure_1.png (带 PDF 名称前缀)
     - figure_1.png (小写)
     """
-    if not figures_dir or not os.path.isdir(figures_dir):
+    if not index:
         return None
     
     # 标准化名称: "Figure 1" -> "Figure_1", "Figure 1(a)" -> "Figure_1(a)"
     normalized = figure_name.replace(" ", "_")
+    normalized_lower = normalized.lower()
     
     # 构建所有可能的文件名模式
     possible_names = [
@@ -262,48 +342,54 @@ def find_figure_file(figures_dir: str, figure_name: str) -> Optional[str]:
         normalized + ".jpg",
         normalized + ".jpeg",
         # 小写
-        normalized.lower() + ".png",
-        normalized.lower() + ".jpg",
+        normalized_lower + ".png",
+        normalized_lower + ".jpg",
         # 无括号版本 Figure_1a
-        normalized.replace("(", "").replace(")", "") + ".png",
+        normalized.translate(_STRIP_PARENS) + ".png",
     ]
     
     # 先尝试精确匹配
     for name in possible_names:
-        filepath = os.path.join(figures_dir, name)
-        if os.path.exists(filepath):
-            return filepath
+        if name in index:
+            return index[name][0]
     
     # 如果精确匹配失败，搜索目录中包含图片名称的文件
     # 这样可以匹配 "<pdf_name>_Figure_1.png" 格式
-    try:
-        for filename in os.listdir(figures_dir):
-            filename_lower = filename.lower()
-            normalized_lower = normalized.lower()
-            
-            # 检查文件名是否包含图片名称
-            if normalized_lower in filename_lower:
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in ['.png', '.jpg', '.jpeg']:
-                    return os.path.join(figures_dir, filename)
-            
-            # 检查无空格版本
-            normalized_no_space = normalized_lower.replace("_", "")
-            filename_no_sep = filename_lower.replace("_", "").replace("-", "")
-            if normalized_no_space in filename_no_sep:
-                ext = os.path.splitext(filename)[1].lower()
-                if ext in ['.png', '.jpg', '.jpeg']:
-                    return os.path.join(figures_dir, filename)
-    except:
-        pass
+    # （索引只含图片文件，扩展名已在 build_figure_index 里先行筛过）
+    normalized_no_space = normalized_lower.replace("_", "")
+    for path, filename_lower, filename_no_sep in index.values():
+        # 检查文件名是否包含图片名称，或其无分隔符版本
+        if normalized_lower in filename_lower or normalized_no_space in filename_no_sep:
+            return path
     
     return None
 
 
-def get_image_size(image_path: str) -> Tuple[int, int]:
-    """获取图片尺寸 (width, height)"""
-    with Image.open(image_path) as img:
-        return img.size
+def load_image_meta(image_path: str) -> Tuple[bytes, int, int]:
+    """读取图片，返回 (文件内容, width, height)
+
+    文件只打开一次：尺寸从内存里的内容解析，内容随后直接交给 add_picture。
+    """
+    with open(image_path, "rb") as f:
+        blob = f.read()
+    # 先只试 PNG/JPEG 两个解码插件，不逐个探测 PIL 注册的全部格式；
+    # 扩展名与内容不符（如 GIF 存成 .png）时再退回完整探测
+    try:
+        img = Image.open(BytesIO(blob), formats=_IMAGE_FORMATS)
+    except UnidentifiedImageError:
+        img = Image.open(BytesIO(blob))
+    with img:
+        width, height = img.size
+    return blob, width, height
+
+
+def _fit_in_cell(ratio: float, cell_w: float, cell_h: float) -> Tuple[float, float]:
+    """按宽高比把图片缩放进单元格，返回 (w, h)"""
+    if ratio > cell_w / cell_h:
+        # 宽图：以宽度为准
+        return cell_w, cell_w / ratio
+    # 高图：以高度为准
+    return cell_h * ratio, cell_h
 
 
 def calculate_image_layout(
@@ -322,302 +408,255 @@ def calculate_image_layout(
     
     n = len(images)
     gap = 0.1  # 图片间隙 (inches)
+    ratios = [img_w / img_h for _, img_w, img_h in images]
     
+    # 选网格 (rows, cols)，每张图在自己的单元格内居中
     if n == 1:
-        # 单张图片：居中显示
-        path, img_w, img_h = images[0]
-        ratio = img_w / img_h
-        
-        # 计算最佳尺寸
-        if ratio > area_width / area_height:
-            # 宽图：以宽度为准
-            w = area_width
-            h = w / ratio
-        else:
-            # 高图：以高度为准
-            h = area_height
-            w = h * ratio
-        
-        x = (area_width - w) / 2
-        y = (area_height - h) / 2
-        return [(path, x, y, w, h)]
-    
+        # 单张图片：整个区域
+        rows, cols = 1, 1
     elif n == 2:
-        # 两张图片：根据宽高比决定横排还是竖排
-        path1, w1, h1 = images[0]
-        path2, w2, h2 = images[1]
-        ratio1 = w1 / h1
-        ratio2 = w2 / h2
-        avg_ratio = (ratio1 + ratio2) / 2
-        
-        if avg_ratio > 1.2:
-            # 偏宽的图：竖排（上下）
-            cell_h = (area_height - gap) / 2
-            results = []
-            for i, (path, img_w, img_h) in enumerate(images):
-                ratio = img_w / img_h
-                if ratio > area_width / cell_h:
-                    w = area_width
-                    h = w / ratio
-                else:
-                    h = cell_h
-                    w = h * ratio
-                x = (area_width - w) / 2
-                y = i * (cell_h + gap) + (cell_h - h) / 2
-                results.append((path, x, y, w, h))
-            return results
-        else:
-            # 偏高的图：横排（左右）
-            cell_w = (area_width - gap) / 2
-            results = []
-            for i, (path, img_w, img_h) in enumerate(images):
-                ratio = img_w / img_h
-                if ratio > cell_w / area_height:
-                    w = cell_w
-                    h = w / ratio
-                else:
-                    h = area_height
-                    w = h * ratio
-                x = i * (cell_w + gap) + (cell_w - w) / 2
-                y = (area_height - h) / 2
-                results.append((path, x, y, w, h))
-            return results
-    
+        # 两张图片：偏宽的图竖排（上下），偏高的图横排（左右）
+        rows, cols = (2, 1) if (ratios[0] + ratios[1]) / 2 > 1.2 else (1, 2)
     else:
         # 3-4张图片：2x2 网格
-        cols = 2
-        rows = (n + 1) // 2
-        cell_w = (area_width - gap * (cols - 1)) / cols
-        cell_h = (area_height - gap * (rows - 1)) / rows
-        
-        results = []
-        for i, (path, img_w, img_h) in enumerate(images):
-            row = i // cols
-            col = i % cols
-            ratio = img_w / img_h
-            
-            if ratio > cell_w / cell_h:
-                w = cell_w
-                h = w / ratio
-            else:
-                h = cell_h
-                w = h * ratio
-            
-            x = col * (cell_w + gap) + (cell_w - w) / 2
-            y = row * (cell_h + gap) + (cell_h - h) / 2
-            results.append((path, x, y, w, h))
-        
-        return results
+        rows, cols = (n + 1) // 2, 2
+    cell_w = (area_width - gap * (cols - 1)) / cols
+    cell_h = (area_height - gap * (rows - 1)) / rows
+    
+    results = []
+    for i, ((path, _, _), ratio) in enumerate(zip(images, ratios)):
+        row, col = divmod(i, cols)
+        w, h = _fit_in_cell(ratio, cell_w, cell_h)
+        x = col * (cell_w + gap) + (cell_w - w) / 2
+        y = row * (cell_h + gap) + (cell_h - h) / 2
+        results.append((path, x, y, w, h))
+    return results
 
 
 # ============================================
 # Markdown 文本格式处理
 # ============================================
 
+def append_run(paragraph, text: str, font_name: str, font_size, color, bold: bool):
+    """
+    在段落末尾追加一个文本 run
+    直接构建 <a:r> 及其 <a:rPr>，一次写好字号/粗体/颜色/字体，
+    代替 add_run() 后 run.font 逐项 setter 的多次查找和改写（生成的 XML 相同）
+    """
+    r = paragraph._p.add_r()  # 插在 <a:endParaRPr> 之前
+    r.text = text             # 沿用 python-pptx 对控制字符的转义
+    rPr = r.get_or_add_rPr()
+    rPr.set("sz", str(font_size.centipoints))
+    rPr.set("b", "1" if bold else "0")
+    SubElement(SubElement(rPr, qn("a:solidFill")), qn("a:srgbClr"), val=str(color))
+    SubElement(rPr, qn("a:latin"), typeface=font_name)
+
+
 def add_formatted_text(paragraph, text: str, base_font_name: str, base_font_size, 
                        base_color, base_bold: bool = False):
     """
     解析并添加带格式的文本到段落
     支持 **粗体** 格式
     """
-    # 匹配 **text** 模式
-    pattern = r'\*\*(.+?)\*\*'
-    last_end = 0
-    
-    for match in re.finditer(pattern, text):
-        # 添加匹配前的普通文本
-        if match.start() > last_end:
-            normal_text = text[last_end:match.start()]
-            if normal_text:
-                run = paragraph.add_run()
-                run.text = normal_text
-                run.font.name = base_font_name
-                run.font.size = base_font_size
-                run.font.bold = base_bold
-                run.font.color.rgb = base_color
-        
-        # 添加粗体文本
-        bold_text = match.group(1)
-        run = paragraph.add_run()
-        run.text = bold_text
-        run.font.name = base_font_name
-        run.font.size = base_font_size
-        run.font.bold = True  # 强制粗体
-        run.font.color.rgb = base_color
-        
-        last_end = match.end()
-    
-    # 添加剩余的普通文本
-    if last_end < len(text):
-        remaining = text[last_end:]
-        if remaining:
-            run = paragraph.add_run()
-            run.text = remaining
-            run.font.name = base_font_name
-            run.font.size = base_font_size
-            run.font.bold = base_bold
-            run.font.color.rgb = base_color
+    # 带捕获组的 split: [普通, 粗体, 普通, 粗体, ..., 普通]，奇数下标为 **text** 内文字
+    for i, part in enumerate(_RE_BOLD.split(text)):
+        if part:
+            # 粗体段强制粗体
+            append_run(paragraph, part, base_font_name, base_font_size, base_color,
+                       True if i % 2 else base_bold)
 
 
 # ============================================
 # 幻灯片复制工具
 # ============================================
 
-def duplicate_slide(prs, template_slide):
+def _try_rgb(color) -> Optional[RGBColor]:
+    """颜色是 RGB 时返回它，否则（未设置、主题色等）返回 None；不靠 .rgb 抛异常来判断"""
+    if color is None or color.type != MSO_COLOR_TYPE.RGB:
+        return None
+    return color.rgb
+
+
+def _read_picture(shape) -> ShapeCopy:
+    """读取图片"""
+    return ShapeCopy("picture", shape.left, shape.top, shape.width, shape.height,
+                     blob=shape.image.blob)
+
+
+def _read_line(shape) -> ShapeCopy:
+    """读取直线和连接器（取不到端点时只能用矩形代替）"""
+    try:
+        ends = (shape.begin_x, shape.begin_y, shape.end_x, shape.end_y)
+    except AttributeError:
+        ends = None
+    return ShapeCopy("line", shape.left, shape.top, shape.width, shape.height, ends=ends,
+                     line_rgb=_try_rgb(shape.line.color), line_width=shape.line.width)
+
+
+def _read_autoshape(shape) -> ShapeCopy:
+    """读取自选形状（矩形、圆形等）"""
+    fill_type = shape.fill.type
+    return ShapeCopy("autoshape", shape.left, shape.top, shape.width, shape.height,
+                     auto_shape_type=shape.auto_shape_type, fill_type=fill_type,
+                     fill_rgb=_try_rgb(shape.fill.fore_color) if fill_type == 1 else None,
+                     line_rgb=_try_rgb(shape.line.color), line_width=shape.line.width)
+
+
+def _read_textbox(shape) -> ShapeCopy:
+    """读取文本框的段落和 run 格式"""
+    paragraphs = []
+    for para in shape.text_frame.paragraphs:
+        runs = []
+        for run in para.runs:
+            font = run.font
+            runs.append((run.text, font.name, font.size, font.bold, font.italic,
+                         _try_rgb(font.color)))
+        paragraphs.append((para.alignment, para.level, runs))
+    return ShapeCopy("textbox", shape.left, shape.top, shape.width, shape.height,
+                     paragraphs=paragraphs)
+
+
+def _add_picture(new_slide, op: ShapeCopy):
+    new_slide.shapes.add_picture(BytesIO(op.blob), op.left, op.top, op.width, op.height)
+
+
+def _add_line(new_slide, op: ShapeCopy):
+    error = "无端点坐标"
+    if op.ends is not None:
+        try:
+            connector = new_slide.shapes.add_connector(
+                1,  # MSO_CONNECTOR.STRAIGHT
+                *op.ends
+            )
+            # 复制线条样式
+            if op.line_rgb is not None:
+                connector.line.color.rgb = op.line_rgb
+            if op.line_width:
+                connector.line.width = op.line_width
+            return
+        except Exception as e:
+            error = e
+    # 如果连接器方式失败，添加一个无填充、有边框的矩形作为替代线条
+    try:
+        line_shape = new_slide.shapes.add_shape(
+            MSO_SHAPE.RECTANGLE,
+            op.left, op.top,
+            op.width, op.height
+        )
+        line_shape.fill.background()
+        if op.line_width:
+            line_shape.line.width = op.line_width
+    except Exception as e2:
+        print(f"  警告: 复制直线失败: {error}, {e2}")
+
+
+def _add_autoshape(new_slide, op: ShapeCopy):
+    new_shape = new_slide.shapes.add_shape(
+        op.auto_shape_type,
+        op.left, op.top,
+        op.width, op.height
+    )
+    # 复制填充
+    if op.fill_type == 1:  # SOLID
+        new_shape.fill.solid()
+        if op.fill_rgb is not None:
+            new_shape.fill.fore_color.rgb = op.fill_rgb
+    elif op.fill_type == 0:  # BACKGROUND
+        new_shape.fill.background()
+    # 复制线条
+    if op.line_rgb is not None:
+        new_shape.line.color.rgb = op.line_rgb
+    if op.line_width:
+        new_shape.line.width = op.line_width
+
+
+def _add_textbox(new_slide, op: ShapeCopy):
+    new_tf = new_slide.shapes.add_textbox(op.left, op.top, op.width, op.height).text_frame
+    for para_idx, (alignment, level, runs) in enumerate(op.paragraphs):
+        new_para = new_tf.paragraphs[0] if para_idx == 0 else new_tf.add_paragraph()
+        new_para.alignment = alignment
+        new_para.level = level
+        for text, name, size, bold, italic, rgb in runs:
+            new_run = new_para.add_run()
+            new_run.text = text
+            if name:
+                new_run.font.name = name
+            if size:
+                new_run.font.size = size
+            if bold is not None:
+                new_run.font.bold = bold
+            if italic is not None:
+                new_run.font.italic = italic
+            # 只复制 RGB 颜色（主题色等取不到 .rgb）
+            if rgb is not None:
+                new_run.font.color.rgb = rgb
+
+
+# 按 shape_type 选择读取方式；不在表中但带文本框的形状按文本框读取
+_SHAPE_READERS = {
+    13: _read_picture,    # MSO_SHAPE_TYPE.PICTURE
+    9: _read_line,        # MSO_SHAPE_TYPE.LINE
+    21: _read_line,       # STRAIGHT_CONNECTOR
+    1: _read_autoshape,   # MSO_SHAPE_TYPE.AUTO_SHAPE
+}
+
+# 按计划类型添加形状，以及失败时的提示
+_SHAPE_ADDERS = {
+    "picture": (_add_picture, "图片"),
+    "line": (_add_line, "直线"),
+    "autoshape": (_add_autoshape, "形状"),
+    "textbox": (_add_textbox, "文本框"),
+}
+
+
+def _plan_copy(template_slide) -> List[ShapeCopy]:
+    """
+    读取模板幻灯片中需要复制的形状（跳过占位符，它们通过布局继承）
+    每个模板只读一次，复制多少页都复用同一份计划
+    """
+    plan = []
+    for shape in template_slide.shapes:
+        if shape.is_placeholder:
+            continue
+        reader = _SHAPE_READERS.get(shape.shape_type)
+        if reader is None:
+            if not shape.has_text_frame:
+                continue
+            reader = _read_textbox
+        try:
+            plan.append(reader(shape))
+        except Exception as e:
+            print(f"  警告: 读取模板形状失败（已跳过）: {e}")
+    return plan
+
+
+def _apply_plan(new_slide, plan: List[ShapeCopy]):
+    """按复制计划把模板形状添加到新幻灯片"""
+    for op in plan:
+        adder, label = _SHAPE_ADDERS[op.kind]
+        try:
+            adder(new_slide, op)
+        except Exception as e:
+            print(f"  警告: 复制{label}失败: {e}")
+
+
+def duplicate_slide(prs, template_slide, plan: Optional[List[ShapeCopy]] = None):
     """
     复制模板幻灯片（保留所有背景和元素）
     
     Args:
         prs: Presentation 对象
         template_slide: 要复制的模板幻灯片
+        plan: _plan_copy(template_slide) 的结果；复制多页时传入以免重复读取模板
     
     Returns:
         新复制的幻灯片
     """
-    from copy import deepcopy
-    from pptx.util import Inches
-    import copy
-    
+    if plan is None:
+        plan = _plan_copy(template_slide)
     # 使用模板幻灯片的布局创建新幻灯片
-    slide_layout = template_slide.slide_layout
-    new_slide = prs.slides.add_slide(slide_layout)
-    
-    # 复制模板幻灯片的所有形状
-    for shape in template_slide.shapes:
-        # 跳过占位符（它们已经通过布局继承了）
-        if shape.is_placeholder:
-            continue
-            
-        # 复制图片
-        if shape.shape_type == 13:  # MSO_SHAPE_TYPE.PICTURE
-            try:
-                # 获取图片数据
-                image_blob = shape.image.blob
-                image_content_type = shape.image.content_type
-                
-                # 添加图片到新幻灯片
-                from io import BytesIO
-                image_stream = BytesIO(image_blob)
-                new_slide.shapes.add_picture(
-                    image_stream,
-                    shape.left,
-                    shape.top,
-                    shape.width,
-                    shape.height
-                )
-            except Exception as e:
-                print(f"  警告: 复制图片失败: {e}")
-        
-        # 复制直线和连接器
-        elif shape.shape_type in (9, 21):  # LINE=9, STRAIGHT_CONNECTOR=21
-            try:
-                # 获取直线的起点和终点坐标
-                connector = new_slide.shapes.add_connector(
-                    1,  # MSO_CONNECTOR.STRAIGHT
-                    shape.begin_x, shape.begin_y,
-                    shape.end_x, shape.end_y
-                )
-                # 复制线条样式
-                if shape.line.color.type is not None:
-                    try:
-                        connector.line.color.rgb = shape.line.color.rgb
-                    except:
-                        pass
-                if shape.line.width:
-                    connector.line.width = shape.line.width
-            except Exception as e:
-                # 如果连接器方式失败，尝试用自选形状方式
-                try:
-                    from pptx.enum.shapes import MSO_SHAPE
-                    # 计算线条的位置和尺寸
-                    left = min(shape.left, shape.left + shape.width)
-                    top = min(shape.top, shape.top + shape.height)
-                    width = abs(shape.width) if shape.width else shape.left
-                    height = abs(shape.height) if shape.height else 1
-                    
-                    # 添加一个矩形作为替代线条
-                    line_shape = new_slide.shapes.add_shape(
-                        MSO_SHAPE.RECTANGLE,
-                        shape.left, shape.top,
-                        shape.width, shape.height
-                    )
-                    # 设置为无填充、有边框
-                    line_shape.fill.background()
-                    if shape.line.width:
-                        line_shape.line.width = shape.line.width
-                except Exception as e2:
-                    print(f"  警告: 复制直线失败: {e}, {e2}")
-        
-        # 复制自选形状（矩形、圆形等）
-        elif shape.shape_type == 1:  # MSO_SHAPE_TYPE.AUTO_SHAPE
-            try:
-                from pptx.enum.shapes import MSO_SHAPE
-                new_shape = new_slide.shapes.add_shape(
-                    shape.auto_shape_type,
-                    shape.left, shape.top,
-                    shape.width, shape.height
-                )
-                # 复制填充
-                if shape.fill.type is not None:
-                    try:
-                        if shape.fill.type == 1:  # SOLID
-                            new_shape.fill.solid()
-                            new_shape.fill.fore_color.rgb = shape.fill.fore_color.rgb
-                        elif shape.fill.type == 0:  # BACKGROUND
-                            new_shape.fill.background()
-                    except:
-                        pass
-                # 复制线条
-                try:
-                    if shape.line.color.type is not None:
-                        new_shape.line.color.rgb = shape.line.color.rgb
-                    if shape.line.width:
-                        new_shape.line.width = shape.line.width
-                except:
-                    pass
-            except Exception as e:
-                print(f"  警告: 复制形状失败: {e}")
-        
-        # 复制文本框
-        elif shape.has_text_frame:
-            try:
-                new_shape = new_slide.shapes.add_textbox(
-                    shape.left, shape.top,
-                    shape.width, shape.height
-                )
-                # 复制文本内容
-                new_tf = new_shape.text_frame
-                for para_idx, para in enumerate(shape.text_frame.paragraphs):
-                    if para_idx == 0:
-                        new_para = new_tf.paragraphs[0]
-                    else:
-                        new_para = new_tf.add_paragraph()
-                    
-                    new_para.alignment = para.alignment
-                    new_para.level = para.level
-                    
-                    for run in para.runs:
-                        new_run = new_para.add_run()
-                        new_run.text = run.text
-                        if run.font.name:
-                            new_run.font.name = run.font.name
-                        if run.font.size:
-                            new_run.font.size = run.font.size
-                        if run.font.bold is not None:
-                            new_run.font.bold = run.font.bold
-                        if run.font.italic is not None:
-                            new_run.font.italic = run.font.italic
-                        # 安全检查颜色类型
-                        try:
-                            if run.font.color and run.font.color.type is not None:
-                                color_rgb = run.font.color.rgb
-                                if color_rgb:
-                                    new_run.font.color.rgb = color_rgb
-                        except:
-                            pass  # 忽略无法获取的颜色
-            except Exception as e:
-                print(f"  警告: 复制文本框失败: {e}")
-    
+    new_slide = prs.slides.add_slide(template_slide.slide_layout)
+    _apply_plan(new_slide, plan)
     return new_slide
 
 
@@ -676,22 +715,51 @@ def create_presentation(
     # 但是直接修改现有的幻灯片
     # 策略：先复制所有需要的模板幻灯片，然后删除原模板
     
+    # 图片目录只扫描一次，各页的配图都在索引里查找；同名配图只查一次
+    figure_index = build_figure_index(figures_dir)
+    resolved_figures: Dict[str, Optional[str]] = {}
+    for slide_data in data.slides:
+        for fig_name in slide_data.figures:
+            if fig_name not in resolved_figures:
+                resolved_figures[fig_name] = find_figure_file(figure_index, fig_name)
+    
+    # 同一图片文件（多页复用的配图）只读一次: 路径 -> (内容, width, height)
+    # 读文件、解析图片头互不相关，用线程池并行预读；pptx 不是线程安全的，仍在主线程构建
+    figure_paths = list(dict.fromkeys(p for p in resolved_figures.values() if p))
+    image_meta: Dict[str, Tuple[bytes, int, int]] = {}
+    if figure_paths:
+        with ThreadPoolExecutor(max_workers=min(16, len(figure_paths))) as pool:
+            image_meta = dict(zip(figure_paths, pool.map(load_image_meta, figure_paths)))
+    
     # 先为每个内容幻灯片复制对应的模板
     slides_to_create = len(data.slides)
     
-    # 复制模板幻灯片
+    # 封面上待替换的文本框（占位文字含 TITLE / SOURCE），复制封面时就归类好
+    cover_shapes: Dict[str, list] = {"title": [], "source": []}
+    
+    # 复制模板幻灯片（两个模板各读取一次，按计划复制）
+    first_plan = _plan_copy(template_first_slide)
+    normal_plan = _plan_copy(template_normal_slide)
     for slide_idx in range(slides_to_create):
         is_first = (slide_idx == 0)
-        template_slide = template_first_slide if is_first else template_normal_slide
-        # 使用 duplicate_slide 复制模板
-        duplicate_slide(prs, template_slide)
+        if is_first:
+            new_slide = duplicate_slide(prs, template_first_slide, first_plan)
+        else:
+            new_slide = duplicate_slide(prs, template_normal_slide, normal_plan)
+        if is_first:
+            for shape in new_slide.shapes:
+                if shape.has_text_frame:
+                    text = shape.text_frame.text.upper()
+                    if "TITLE" in text:
+                        cover_shapes["title"].append(shape)
+                    elif "SOURCE" in text:
+                        cover_shapes["source"].append(shape)
     
-    # 现在删除原始的两个模板幻灯片
-    # 删除时从后往前删除，避免索引问题
-    for _ in range(2):
-        rId = prs.slides._sldIdLst[0].rId
-        prs.part.drop_rel(rId)
-        del prs.slides._sldIdLst[0]
+    # 现在删除原始的两个模板幻灯片（列表最前面的两项），先取出再一并移除
+    sldIdLst = prs.slides._sldIdLst
+    for sldId in list(sldIdLst)[:2]:
+        prs.part.drop_rel(sldId.rId)
+        sldIdLst.remove(sldId)
     
     # 遍历每个 Slide 并填充内容
     for slide_idx, slide_data in enumerate(data.slides):
@@ -708,31 +776,28 @@ def create_presentation(
         
         # === 第一页：替换标题和来源文本框 ===
         if is_first:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    text = shape.text_frame.text.strip().upper()
-                    if "TITLE" in text:
-                        # 替换标题
-                        shape.text_frame.clear()
-                        p = shape.text_frame.paragraphs[0]
-                        run = p.add_run()
-                        run.text = data.title
-                        run.font.name = FONT_CONFIG["family"]
-                        run.font.size = FONT_CONFIG["title_size"]
-                        run.font.bold = True
-                        run.font.color.rgb = COLORS["title"]
-                        p.alignment = PP_ALIGN.CENTER
-                    elif "SOURCE" in text:
-                        # 替换来源
-                        shape.text_frame.clear()
-                        p = shape.text_frame.paragraphs[0]
-                        run = p.add_run()
-                        run.text = data.source
-                        run.font.name = FONT_CONFIG["family"]
-                        run.font.size = FONT_CONFIG["source_size"]
-                        run.font.italic = True
-                        run.font.color.rgb = COLORS["source"]
-                        p.alignment = PP_ALIGN.CENTER
+            for shape in cover_shapes["title"]:
+                # 替换标题
+                shape.text_frame.clear()
+                p = shape.text_frame.paragraphs[0]
+                run = p.add_run()
+                run.text = data.title
+                run.font.name = FONT_CONFIG["family"]
+                run.font.size = FONT_CONFIG["title_size"]
+                run.font.bold = True
+                run.font.color.rgb = COLORS["title"]
+                p.alignment = PP_ALIGN.CENTER
+            for shape in cover_shapes["source"]:
+                # 替换来源
+                shape.text_frame.clear()
+                p = shape.text_frame.paragraphs[0]
+                run = p.add_run()
+                run.text = data.source
+                run.font.name = FONT_CONFIG["family"]
+                run.font.size = FONT_CONFIG["source_size"]
+                run.font.italic = True
+                run.font.color.rgb = COLORS["source"]
+                p.alignment = PP_ALIGN.CENTER
         
         # === 添加大纲内容 ===
         if slide_data.bullets:
@@ -778,12 +843,7 @@ def create_presentation(
                 p.space_before = space_before
                 
                 # 添加带格式的文本（先添加符号，再添加内容）
-                run = p.add_run()
-                run.text = bullet_char
-                run.font.name = FONT_CONFIG["family"]
-                run.font.size = font_size
-                run.font.bold = is_bold
-                run.font.color.rgb = font_color
+                append_run(p, bullet_char, FONT_CONFIG["family"], font_size, font_color, is_bold)
                 
                 # 添加内容（支持 **粗体** 格式）
                 add_formatted_text(p, bullet.text, FONT_CONFIG["family"], 
@@ -794,9 +854,9 @@ def create_presentation(
             # 收集图片信息
             images_info = []
             for fig_name in slide_data.figures:
-                fig_path = find_figure_file(figures_dir, fig_name)
+                fig_path = resolved_figures[fig_name]
                 if fig_path:
-                    w, h = get_image_size(fig_path)
+                    _, w, h = image_meta[fig_path]
                     images_info.append((fig_path, w, h))
                 else:
                     print(f"  警告: 找不到图片 '{fig_name}'")
@@ -809,13 +869,15 @@ def create_presentation(
                 
                 # 添加图片
                 for path, x, y, w, h in layout_result:
-                    slide.shapes.add_picture(
-                        path,
+                    pic = slide.shapes.add_picture(
+                        BytesIO(image_meta[path][0]),
                         Inches(image_x + x),
                         Inches(content_start + y),
                         Inches(w),
                         Inches(h)
                     )
+                    # 从内存流添加的图片没有文件名（descr 会变成 "image.png"），补回原文件名
+                    pic._element.nvPicPr.cNvPr.set("descr", os.path.basename(path))
         
         # === 添加 Speaker Notes ===
         if slide_data.notes:
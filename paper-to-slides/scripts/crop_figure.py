@@ -7,10 +7,11 @@ The bounding box is read off the 0-1000 grid produced by locate_figure.py and
 passed here. The crop handles three coordinate systems and adds a small margin.
 
 PRECISION AID — every run also writes a "<output>_check.png": the chosen bbox
-drawn as a bold box on the page (using the grid copy when available). Inspect that
-check image to verify each edge before trusting the crop — it makes "caption
-cut off" or "next section bled in" obvious. Adjust --bbox and re-run until the
-box is tight.
+drawn as a bold box on the page (using the grid copy when available), zoomed to
+the box plus some surrounding context (--check-full for the whole page).
+Inspect that check image to verify each edge before trusting the crop — it
+makes "caption cut off" or "next section bled in" obvious. Adjust --bbox and
+re-run until the box is tight.
 
 Coordinate systems accepted for --bbox x1,y1,x2,y2:
     * 0-1000 scale   (default, matches the grid)   e.g. 120,150,880,560
@@ -29,9 +30,10 @@ Examples:
 
 import os
 import sys
+import json
 import argparse
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple, Union
 
 try:
     from PIL import Image, ImageDraw, ImageFont
@@ -41,6 +43,12 @@ except ImportError as e:
     sys.exit(1)
 
 
+# Longest side of the *_check.png overlay; larger gets downsampled by any viewer anyway.
+CHECK_MAX_SIDE = 1600
+# Page fraction of context kept around the bbox in the overlay (see make_check_overlay).
+CHECK_CONTEXT = 0.15
+
+
 def _to_normalized(bbox: List[float], width: int, height: int) -> List[float]:
     """Auto-detect coordinate system and return normalized 0-1 [x1,y1,x2,y2]."""
     x1, y1, x2, y2 = bbox
@@ -57,19 +65,27 @@ def _to_normalized(bbox: List[float], width: int, height: int) -> List[float]:
     return [x1, y1, x2, y2]
 
 
+def _clamped_box(bbox: List[float], width: int, height: int,
+                 padding: float = 0.0) -> List[float]:
+    """Normalize (see _to_normalized), grow by `padding` and clamp to [0, 1].
+    `width`/`height` are the page the bbox was read against (for pixel bboxes)."""
+    x1, y1, x2, y2 = _to_normalized(bbox, width, height)
+    return [max(0.0, x1 - padding), max(0.0, y1 - padding),
+            min(1.0, x2 + padding), min(1.0, y2 + padding)]
+
+
+def _to_pixels(box: List[float], width: int, height: int) -> Tuple[int, int, int, int]:
+    """Normalized [x1,y1,x2,y2] -> integer pixel box on an image of this size."""
+    x1, y1, x2, y2 = box
+    return int(x1 * width), int(y1 * height), int(x2 * width), int(y2 * height)
+
+
 def crop_image_by_bbox(image: "Image.Image", bbox: List[float],
                        padding_percent: float = 0.01) -> "Image.Image":
     """Crop by bbox (auto-detects 0-1000 / normalized / pixel)."""
     width, height = image.size
-    x1, y1, x2, y2 = _to_normalized(bbox, width, height)
-
-    x1 = max(0.0, x1 - padding_percent)
-    y1 = max(0.0, y1 - padding_percent)
-    x2 = min(1.0, x2 + padding_percent)
-    y2 = min(1.0, y2 + padding_percent)
-
-    left, top = int(x1 * width), int(y1 * height)
-    right, bottom = int(x2 * width), int(y2 * height)
+    left, top, right, bottom = _to_pixels(
+        _clamped_box(bbox, width, height, padding_percent), width, height)
     if right <= left or bottom <= top:
         print(f"  Warning: invalid crop area ({left},{top},{right},{bottom}); returning full page")
         return image
@@ -85,27 +101,115 @@ def find_grid_sibling(page_image: str) -> Optional[str]:
     return str(cand) if cand.exists() else None
 
 
-def make_check_overlay(base_image_path: str, bbox: List[float], out_path: str) -> None:
-    """Draw the chosen bbox as a bold box on the (gridded) page for verification."""
-    img = Image.open(base_image_path).convert("RGB")
+HISTORY_FILE = ".crop_rounds.json"   # beside the page images: output path -> bboxes tried
+CONVERGED_DELTA = 5                   # 0-1000 units; matches the extraction guide
+MAX_ROUNDS = 3
+
+
+def track_round(out: Path, page_image: str, box: List[float]) -> str:
+    """Record this round's bbox (in 0-1000 units) for `out` and judge the loop:
+    converged when no edge moved >= CONVERGED_DELTA, oscillating when the box
+    returns to an earlier round's, and over budget after MAX_ROUNDS. Starting
+    over on a different page image resets the history. The history lives beside
+    the page images, not in the output dir that gets delivered."""
+    hist_path = Path(page_image).parent / HISTORY_FILE
+    key = os.path.abspath(out)
+    try:
+        history = json.loads(hist_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        history = {}
+    entry = history.get(key)
+    if not entry or entry.get("page") != os.path.abspath(page_image):
+        entry = {"page": os.path.abspath(page_image), "rounds": []}
+    rounds = entry["rounds"]
+    rounds.append([round(v) for v in box])
+    history[key] = entry
+    try:
+        hist_path.write_text(json.dumps(history), encoding="utf-8")
+    except OSError:
+        pass
+
+    n = len(rounds)
+    if n == 1:
+        return "round 1"
+
+    def delta(a: List[int], b: List[int]) -> int:
+        return max(abs(u - v) for u, v in zip(a, b))
+
+    d = delta(rounds[-1], rounds[-2])
+    if d < CONVERGED_DELTA:
+        return f"round {n}: max edge change {d} < {CONVERGED_DELTA} -> converged, finalize this crop"
+    for k, earlier in enumerate(rounds[:-2], start=1):
+        if delta(rounds[-1], earlier) < CONVERGED_DELTA:
+            return (f"round {n}: same box as round {k} -> oscillating; "
+                    f"keep the better of rounds {k}-{n - 1} and stop")
+    if n >= MAX_ROUNDS:
+        return f"round {n}: max edge change {d}; {MAX_ROUNDS}-round budget reached, settle now"
+    return f"round {n}: max edge change {d}"
+
+
+def make_check_overlay(base: Union[str, "Image.Image"], bbox: List[float], out_path: str,
+                       max_side: int = CHECK_MAX_SIDE,
+                       page_size: Optional[Tuple[int, int]] = None,
+                       context: Optional[float] = CHECK_CONTEXT) -> None:
+    """Draw the chosen bbox as a bold box on the (gridded) page for verification.
+    `base` is a path or an already-decoded page (never modified); `page_size` is
+    the clean page's size, which pixel bboxes refer to (the grid copy is
+    smaller). The overlay is only ever looked at, so it is drawn on a copy
+    downscaled to `max_side` (0 = full size) -- the crop always uses the full page.
+
+    The view is the bbox plus `context` (a page fraction) on every side, so the
+    edges being judged show at a higher effective resolution; the grid's
+    page-edge labels are cropped away with it and get redrawn along the view's
+    top/left edges. `context=None`, or a view less than a pixel across, shows
+    the whole page."""
+    img = base if isinstance(base, Image.Image) else Image.open(base)
+    box = _clamped_box(bbox, *(page_size or img.size))
+    view = [0.0, 0.0, 1.0, 1.0] if context is None else _clamped_box(box, 1, 1, context)
+    if context is not None:
+        vx1, vy1, vx2, vy2 = _to_pixels(view, *img.size)
+        if vx2 <= vx1 or vy2 <= vy1:
+            # Degenerate bbox with no context around it: nothing to zoom into.
+            context, view = None, [0.0, 0.0, 1.0, 1.0]
+    img = img.convert("RGB")   # palette grid -> RGB; always a fresh copy, safe to draw on
+    if context is not None:
+        img = img.crop(_to_pixels(view, *img.size))
+    if max_side and max(img.size) > max_side:
+        scale = max_side / max(img.size)
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                         Image.BILINEAR)
     w, h = img.size
-    x1, y1, x2, y2 = _to_normalized(bbox, w, h)
-    px = [int(x1 * w), int(y1 * h), int(x2 * w), int(y2 * h)]
+    vx1, vy1, vx2, vy2 = view
+    vw, vh = vx2 - vx1, vy2 - vy1
+    px = list(_to_pixels([(box[0] - vx1) / vw, (box[1] - vy1) / vh,
+                          (box[2] - vx1) / vw, (box[3] - vy1) / vh], w, h))
     draw = ImageDraw.Draw(img, "RGBA")
     draw.rectangle(px, fill=(0, 120, 255, 28))            # faint fill = captured region
     draw.rectangle(px, outline=(0, 120, 255, 255), width=max(3, w // 350))
     try:
         font = ImageFont.truetype(
             "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", max(14, w // 80))
-    except Exception:
+    except OSError:   # font file missing (non-Debian systems)
         font = ImageFont.load_default()
+    if context is not None:
+        # 0-1000 ruler values along the view's edges (every 50 when zoomed in),
+        # unless the view still reaches the page edge carrying the grid's own.
+        for u in range(0, 1001, 50 if vw < 0.5 else 100):
+            fx = (u / 1000 - vx1) / vw
+            if vy1 > 0 and 0 < fx < 1:
+                draw.text((fx * w + 3, 3), str(u), fill=(200, 0, 0, 255), font=font)
+        for u in range(0, 1001, 50 if vh < 0.5 else 100):
+            fy = (u / 1000 - vy1) / vh
+            if vx1 > 0 and 0 < fy < 1:
+                draw.text((3, fy * h + 2), str(u), fill=(200, 0, 0, 255), font=font)
     if max(bbox) > 1:
         label = "bbox " + ",".join(str(int(v)) for v in bbox)
     else:
         label = "bbox " + ",".join(f"{v:.3f}" for v in bbox)
     draw.text((px[0] + 4, max(0, px[1] - max(18, w // 70))), label,
               fill=(0, 90, 220, 255), font=font)
-    img.save(out_path, "PNG")
+    # View-only: a palette PNG is ~2.5x smaller and keeps the box edges crisp.
+    img.quantize(256, method=Image.Quantize.FASTOCTREE).save(out_path, "PNG")
 
 
 def main():
@@ -117,6 +221,12 @@ def main():
                     help="extra margin fraction (default 0.01; 0.005 with --sub)")
     ap.add_argument("--sub", action="store_true", help="sub-figure mode: tighter padding")
     ap.add_argument("--no-check", action="store_true", help="skip the check-overlay image")
+    ap.add_argument("--check-context", type=float, default=CHECK_CONTEXT,
+                    help=f"page fraction shown around the bbox in the check overlay (default {CHECK_CONTEXT})")
+    ap.add_argument("--check-full", action="store_true",
+                    help="draw the check overlay on the whole page instead")
+    ap.add_argument("--check-max-side", type=int, default=CHECK_MAX_SIDE,
+                    help=f"longest side of the check overlay in px (default {CHECK_MAX_SIDE}; 0 = full size)")
     args = ap.parse_args()
 
     if not os.path.exists(args.page_image):
@@ -124,9 +234,10 @@ def main():
         sys.exit(1)
     try:
         bbox = [float(v) for v in args.bbox.split(",")]
-        assert len(bbox) == 4
-    except Exception:
-        print('Error: --bbox must be "x1,y1,x2,y2"')
+    except ValueError:
+        bbox = []
+    if len(bbox) != 4:
+        print(f'Error: --bbox must be "x1,y1,x2,y2", got "{args.bbox}"')
         sys.exit(1)
 
     padding = args.padding if args.padding is not None else (0.005 if args.sub else 0.01)
@@ -136,13 +247,19 @@ def main():
 
     out = Path(args.output)
     out.parent.mkdir(parents=True, exist_ok=True)
-    cropped.save(out, "PNG", optimize=True)
+    # zlib's default level: optimize=True (level 9) is ~6x slower for a ~4%
+    # smaller file, paid again on every refinement round.
+    cropped.save(out, "PNG")
     print(f"[crop] saved: {out}  ({cropped.size[0]}x{cropped.size[1]}px)")
+    box = [v * 1000 for v in _clamped_box(bbox, *img.size)]   # off-page parts are not a change
+    print(f"[crop] {track_round(out, args.page_image, box)}")
 
     if not args.no_check:
-        base = find_grid_sibling(args.page_image) or args.page_image
+        # No grid copy: draw on the page already in memory instead of re-reading it.
+        base = find_grid_sibling(args.page_image) or img
         check_path = str(out.with_name(out.stem + "_check.png"))
-        make_check_overlay(base, bbox, check_path)
+        make_check_overlay(base, bbox, check_path, args.check_max_side, img.size,
+                           None if args.check_full else max(0.0, args.check_context))
         print(f"[crop] CHECK overlay (inspect to verify edges): {check_path}")
 
 
@@ -9,31 +9,51 @@ Two deterministic preparation steps before cropping:
      table caption appears.
   2. Render those page(s) to PNG, and also emit a *_grid.png copy with a 0-1000
      coordinate ruler overlaid so the crop region can be read off accurately.
+     The grid copy is only ever viewed, so it is downscaled to what a vision
+     model actually looks at (<= 1568 px) and saved as a 256-colour palette
+     PNG; the clean page stays full-resolution RGB for cropping.
      The bounding box is decided by viewing the rendered page, then handed to
      crop_figure.py.
 
+Rendered pages and their grid copies are cached on disk, keyed by the PDF's
+MD5 and the DPI (~/.cache/paper-to-slides/pages/<md5>/<dpi>/p<N>.png), so
+locating several figures that share a page -- or re-running after a bad crop --
+never renders or draws the same page twice. Pass --no-cache to bypass it.
+The cache is capped at --cache-max-mb (default 1024): after each run, whole
+PDFs are evicted least-recently-used first until it fits again.
+
 Usage:
-    python locate_figure.py <pdf_path> <figure_name> [options]
+    python locate_figure.py <pdf_path> <figure_name> [<figure_name> ...] [options]
 
 Examples:
     python locate_figure.py paper.pdf "Figure 1"
     python locate_figure.py paper.pdf "Table 2" -d work/pages --dpi 200
     python locate_figure.py paper.pdf "Figure 3(a)" --max-pages 2
+    python locate_figure.py paper.pdf "Figure 1" "Figure 2" "Table 1"
+    python locate_figure.py paper.pdf --from-content work/ppt_content.md -d work/pages
 
-Output (printed as a small JSON block + human log):
+Output (printed as a small JSON block + human log, one per figure):
     candidate pages (1-indexed), and for each rendered page:
       - clean image path   (use this for cropping)
       - grid  image path   (read coordinates from this)
       - pixel width/height
+      - caption / graphics boxes from the PDF layout (0-1000), as bbox hints,
+        and a suggested bbox joining them (a first crop to verify, not a final one)
+    --json prints only the RESULT_JSON lines (no human log).
 """
 
 import os
 import re
 import sys
 import json
+import shutil
+import hashlib
 import argparse
+import threading
+from collections import deque
 from pathlib import Path
-from typing import List, Dict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, List, Dict, Optional
 
 try:
     import fitz  # PyMuPDF
@@ -44,14 +64,41 @@ except ImportError as e:
     sys.exit(1)
 
 
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") \
+    / "paper-to-slides" / "pages"
+# Size cap for the page cache; whole PDFs are evicted oldest-used first.
+CACHE_MAX_MB = 1024
+
+# Longest side of the *_grid.png copy. Vision models downsample larger images to
+# about this size anyway, so drawing the grid at this size keeps its labels
+# legible and the upload small; coordinates are 0-1000 so nothing is lost.
+GRID_MAX_SIDE = 1568
+# Part of the cached grid file name: bump whenever add_coordinate_grid's output changes.
+GRID_CACHE_VERSION = 1
+
+
 # ---------------------------------------------------------------------------
 # Figure-name normalization + search variants
 # ---------------------------------------------------------------------------
 
+_RE_PAREN_OPEN = re.compile(r"\s*\(\s*")
+_RE_PAREN_CLOSE = re.compile(r"\s*\)\s*")
+_RE_SUBFIGURE = re.compile(r"^((?:Figure|Table|Fig\.?)\s*\d+)\s*[\(\[]\s*[a-zA-Z]\s*[\)\]]",
+                           re.IGNORECASE)
+# Leading "Figure" / "Fig." / "Fig" -> the other two spellings to add as variants.
+_VARIANT_PREFIXES = (
+    (re.compile(r"^figure\s+", re.IGNORECASE), ("Fig.", "Fig")),
+    (re.compile(r"^fig\.\s+", re.IGNORECASE), ("Figure", "Fig")),
+    (re.compile(r"^fig\s+", re.IGNORECASE), ("Figure", "Fig.")),
+)
+_RE_CONTENT_ONLY = re.compile(r"\s*\[content-only\]", re.IGNORECASE)
+_RE_UNSAFE_NAME = re.compile(r"[^\w\-_\(\)]")
+
+
 def normalize_figure_name(name: str) -> str:
     name = name.strip()
-    name = re.sub(r"\s*\(\s*", "(", name)
-    name = re.sub(r"\s*\)\s*", ")", name)
+    name = _RE_PAREN_OPEN.sub("(", name)
+    name = _RE_PAREN_CLOSE.sub(")", name)
     return name
 
 
@@ -61,59 +108,274 @@ def build_figure_search_variants(figure_name: str) -> List[str]:
     normalized = normalize_figure_name(figure_name)
     variants = {normalized}
 
-    sub_match = re.match(
-        r"^((?:Figure|Table|Fig\.?)\s*\d+)\s*[\(\[]\s*[a-zA-Z]\s*[\)\]]",
-        normalized, re.IGNORECASE,
-    )
+    sub_match = _RE_SUBFIGURE.match(normalized)
     if sub_match:
         variants.add(sub_match.group(1))
 
     for v in list(variants):
-        if re.match(r"(?i)^figure\s", v):
-            suffix = re.sub(r"(?i)^figure\s+", "", v)
-            variants.add(f"Fig. {suffix}")
-            variants.add(f"Fig {suffix}")
-        elif re.match(r"(?i)^fig\.\s", v):
-            suffix = re.sub(r"(?i)^fig\.\s+", "", v)
-            variants.add(f"Figure {suffix}")
-            variants.add(f"Fig {suffix}")
-        elif re.match(r"(?i)^fig\s", v) and not re.match(r"(?i)^fig\.", v):
-            suffix = re.sub(r"(?i)^fig\s+", "", v)
-            variants.add(f"Figure {suffix}")
-            variants.add(f"Fig. {suffix}")
+        for prefix, others in _VARIANT_PREFIXES:
+            m = prefix.match(v)
+            if m:
+                variants.update(f"{o} {v[m.end():]}" for o in others)
+                break
     return list(variants)
 
 
-def detect_candidate_pages(pdf_path: str, figure_name: str) -> List[int]:
+def build_figure_pattern(figure_name: str) -> "re.Pattern":
+    """One case-insensitive regex over all variants. Whitespace inside a name is
+    optional and may be a line break ("Figure\\n1", "Figure1"), and a trailing
+    number must end there, so "Figure 1" no longer matches "Figure 12"."""
+    variants = sorted(build_figure_search_variants(figure_name), key=len, reverse=True)
+    alternatives = [r"\s*".join(re.escape(tok) for tok in v.split()) for v in variants]
+    return re.compile(r"(?<![A-Za-z])(?:" + "|".join(alternatives) + r")(?!\d)",
+                      re.IGNORECASE)
+
+
+def detect_candidate_pages(pdf_path: str, figure_name: str,
+                           doc: Optional["fitz.Document"] = None,
+                           page_texts: Optional[List[str]] = None) -> List[int]:
     """Return 0-indexed candidate page numbers via a single O(n) text scan.
-    Last occurrence first (captions usually come after in-text references)."""
-    doc = fitz.open(pdf_path)
-    variants = build_figure_search_variants(figure_name)
-    hits: List[int] = []
-    for page_num in range(len(doc)):
-        text_lower = doc[page_num].get_text().lower()
-        for variant in variants:
-            if variant.lower() in text_lower:
-                hits.append(page_num)
-                break
-    doc.close()
+    Last occurrence first (captions usually come after in-text references).
+    Pass `page_texts` (one string per page) to search text extracted once for a
+    whole batch, or an open `doc` to reuse it; otherwise the PDF is opened here."""
+    if page_texts is None:
+        own = doc is None
+        if own:
+            doc = fitz.open(pdf_path)
+        page_texts = [page.get_text() for page in doc]
+        if own:
+            doc.close()
+    pattern = build_figure_pattern(figure_name)
+    hits = [page_num for page_num, text in enumerate(page_texts) if pattern.search(text)]
     return list(reversed(hits)) if len(hits) > 1 else hits
 
 
+_FIGURE_HEADERS = ("**配图**:", "**Figures**:")
+
+
+def figures_from_content(content_path: str) -> List[str]:
+    """Collect every figure reference in ppt_content.md, in order, de-duplicated.
+    Follows build_ppt.py's rules: only headers inside a "## Slide" section count,
+    with an inline comma list after **配图**: or the "- " lines below it (each
+    also comma-split) up to the next other line or "---"; "# ..." comments and
+    [content-only] are stripped, and placeholders such as "[无合适配图]" are skipped."""
+    names: List[str] = []
+    in_slide = in_figures = False
+    with open(content_path, "r", encoding="utf-8") as f:
+        for line in f:
+            trimmed = line.strip()
+            if trimmed.startswith("## Slide"):
+                in_slide, in_figures = True, False
+                continue
+            if not in_slide:
+                continue
+            if trimmed == "---":
+                in_figures = False
+                continue
+            if trimmed.startswith(_FIGURE_HEADERS):
+                rest = trimmed.split(":", 1)[1].strip()
+                in_figures = not rest or rest.startswith("-")
+                items = [] if in_figures else rest.split(",")
+            elif in_figures and trimmed.startswith("- "):
+                items = trimmed[2:].split("#")[0].split(",")
+            else:
+                if in_figures and trimmed and not trimmed.startswith("-"):
+                    in_figures = False
+                continue
+            for item in items:
+                name = _RE_CONTENT_ONLY.sub("", item).strip()
+                if name and not name.startswith("[") and name not in names:
+                    names.append(name)
+    return names
+
+
+def build_caption_pattern(figure_name: str) -> "re.Pattern":
+    """Like build_figure_pattern, but for a caption: the name followed by ':',
+    '.' or '|' ("Figure 2 | ...", "Table 1: ..."), to be matched at a text
+    block's start -- in-text references ("Figure 2 shows") don't qualify."""
+    return re.compile(build_figure_pattern(figure_name).pattern + r"\s*[:.|]", re.IGNORECASE)
+
+
+def page_layout(page: "fitz.Page") -> Dict:
+    """A page's text blocks and graphics, in the grid's 0-1000 units: embedded
+    raster images and clustered vector drawings. Extracted once per page per
+    run; only the caption lookup on top of it depends on the figure."""
+    w, h = page.rect.width, page.rect.height
+
+    def scaled(r) -> List[int]:
+        return [round(r[0] / w * 1000), round(r[1] / h * 1000),
+                round(r[2] / w * 1000), round(r[3] / h * 1000)]
+
+    blocks = [(scaled(b[:4]), b[4].strip()) for b in page.get_text("blocks") if b[6] == 0]
+    boxes = [info["bbox"] for info in page.get_image_info()]
+    if hasattr(page, "cluster_drawings"):   # PyMuPDF >= 1.24
+        boxes += [tuple(r) for r in page.cluster_drawings()]
+    min_area = 0.005 * w * h                # drop icons, bullets, stray rules
+    graphics = [scaled(b) for b in boxes if (b[2] - b[0]) * (b[3] - b[1]) >= min_area]
+    graphics.sort(key=lambda b: (b[1], b[0]))
+    return {"blocks": blocks, "graphics": graphics}
+
+
+def find_caption_block(layout: Dict, caption_pattern: "re.Pattern") -> Optional[List[int]]:
+    """The first text block of a page_layout() that starts with the caption."""
+    for box, text in layout["blocks"]:
+        if caption_pattern.match(text):
+            return box
+    return None
+
+
+def rank_candidate_pages(layouts: Dict[int, Dict], candidates: List[int],
+                         caption_pattern: "re.Pattern") -> List[int]:
+    """Move pages carrying the caption itself ahead of pages that only cite the
+    figure, keeping the text-scan order otherwise -- so the page with the
+    figure is the one --max-pages renders even when citations come later.
+    `layouts` maps each candidate page to its page_layout()."""
+    if len(candidates) < 2:
+        return candidates
+    return sorted(candidates, key=lambda p: find_caption_block(layouts[p], caption_pattern) is None)
+
+
+def page_layout_hints(layout: Dict, caption_pattern: "re.Pattern") -> Dict:
+    """Where the caption and the graphics sit on a page, from its page_layout().
+    A starting point for reading the bbox -- never a replacement for looking at
+    the page (figures made of text, e.g. tables, have few graphics)."""
+    caption = find_caption_block(layout, caption_pattern)
+    graphics = layout["graphics"]
+    return {"caption": caption, "graphics": graphics,
+            "suggested": suggest_bbox(caption, graphics)}
+
+
+def suggest_bbox(caption: Optional[List[int]], graphics: List[List[int]],
+                 max_gap: int = 80) -> Optional[List[int]]:
+    """A first-guess bbox: the caption plus the run of graphics chained to it on
+    one side (figures usually sit above their caption, tables below), each
+    starting within `max_gap` units of the chain's current extent, so panels
+    side by side in one row are all kept. A graphic must also overlap the
+    chain horizontally, so a figure in the other column of a two-column page
+    is never merged in. None without a caption or graphics."""
+    if caption is None:
+        return None
+    above = sorted((g for g in graphics if g[3] <= caption[1] + 10), key=lambda g: -g[3])
+    below = sorted((g for g in graphics if g[1] >= caption[3] - 10), key=lambda g: g[1])
+    chains = []
+    for side, edge_of, near, far in ((above, caption[1], 3, 1), (below, caption[3], 1, 3)):
+        chain, edge = [], edge_of
+        left, right = caption[0], caption[2]
+        for g in side:
+            if (g[3] < edge - max_gap) if far == 1 else (g[1] > edge + max_gap):
+                break
+            if g[2] <= left or g[0] >= right:   # another column
+                continue
+            chain.append(g)
+            edge = min(edge, g[far]) if far == 1 else max(edge, g[far])
+            left, right = min(left, g[0]), max(right, g[2])
+        if chain:
+            chains.append((abs(chain[0][near] - edge_of), chain))
+    if not chains:
+        return None
+    chain = min(chains, key=lambda c: c[0])[1]   # the side whose nearest block is closest
+    boxes = chain + [caption]
+    return [min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes)]
+
+
 # ---------------------------------------------------------------------------
 # Rendering
 # ---------------------------------------------------------------------------
 
-def render_page(pdf_path: str, page_num: int, dpi: int) -> Image.Image:
-    doc = fitz.open(pdf_path)
+def render_page(pdf_path: str, page_num: int, dpi: int,
+                doc: Optional["fitz.Document"] = None) -> Image.Image:
+    own = doc is None
+    if own:
+        doc = fitz.open(pdf_path)
     page = doc[page_num]
     zoom = dpi / 72.0
     pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
     img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    doc.close()
+    if own:
+        doc.close()
     return img
 
 
+def pdf_fingerprint(pdf_path: str) -> str:
+    """MD5 of the PDF bytes: the cache key, so an edited PDF never hits stale pages."""
+    h = hashlib.md5()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _tmp_path(path: Path) -> Path:
+    """Per-process, per-thread temp name next to `path`, for write + os.replace,
+    so a concurrent run never reads a partial PNG from the cache."""
+    return path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+_RE_CACHE_KEY = re.compile(r"[0-9a-f]{32}")                       # pdf_fingerprint()
+_RE_CACHE_FILE = re.compile(r"p\d+(?:_grid\d+_v\d+)?(?:\.png|\.\d+\.\d+\.tmp)")
+
+
+def _cache_entry_size(entry: Path) -> Optional[int]:
+    """Bytes held by one per-PDF cache dir, or None unless it has exactly the
+    layout this script writes (<md5>/<dpi>/p<N>[_grid...].png) -- anything else
+    under --cache-dir is not ours to size or delete."""
+    if not _RE_CACHE_KEY.fullmatch(entry.name):
+        return None
+    size = 0
+    for dpi_dir in os.scandir(entry):
+        if not (dpi_dir.is_dir(follow_symlinks=False) and dpi_dir.name.isdigit()):
+            return None
+        for f in os.scandir(dpi_dir.path):
+            if not (f.is_file(follow_symlinks=False) and _RE_CACHE_FILE.fullmatch(f.name)):
+                return None
+            size += f.stat().st_size
+    return size
+
+
+def prune_cache(cache_root: Path, max_mb: int, keep: Optional[Path] = None) -> None:
+    """Evict whole per-PDF cache dirs, least recently used first, until the cache
+    is under `max_mb`. `keep` (the PDF just used) is never evicted, and only
+    dirs with the cache's own layout are counted or removed."""
+    if not cache_root.is_dir():
+        return
+    entries = []
+    for d in cache_root.iterdir():
+        if d.is_dir() and not d.is_symlink():
+            size = _cache_entry_size(d)
+            if size is not None:
+                entries.append((d.stat().st_mtime, size, d))
+    total = sum(size for _, size, _ in entries)
+    for _, size, d in sorted(entries, key=lambda e: e[0]):
+        if total <= max_mb * 1024 * 1024:
+            break
+        if d != keep:
+            shutil.rmtree(d, ignore_errors=True)
+            total -= size
+
+
+def save_view_png(img: Image.Image, path: Path) -> None:
+    """Save a view-only image as a palette PNG. Text pages compress far better
+    this way than as JPEG (which rings around glyphs and comes out larger)."""
+    img.quantize(256, method=Image.Quantize.FASTOCTREE).save(path, "PNG")
+
+
+_fonts = threading.local()
+
+
+def _grid_font(size: int):
+    """Load the label font once per size and thread instead of once per page.
+    Per thread because FreeType faces are not safe to share between threads."""
+    cache = _fonts.__dict__.setdefault("by_size", {})
+    if size not in cache:
+        try:
+            cache[size] = ImageFont.truetype(
+                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", size)
+        except OSError:   # font file missing (non-Debian systems)
+            cache[size] = ImageFont.load_default()
+    return cache[size]
+
+
 def add_coordinate_grid(img: Image.Image) -> Image.Image:
     """Overlay a 0-1000 coordinate ruler for reading bbox coords precisely.
     Minor lines every 50 units (very faint), major every 100 (faint + labeled),
@@ -122,13 +384,7 @@ def add_coordinate_grid(img: Image.Image) -> Image.Image:
     draw = ImageDraw.Draw(g, "RGBA")
     w, h = g.size
 
-    try:
-        font = ImageFont.truetype(
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-            max(13, w // 95),
-        )
-    except Exception:
-        font = ImageFont.load_default()
+    font = _grid_font(max(13, w // 95))
 
     minor = (255, 0, 0, 32)    # every 50
     major = (255, 0, 0, 80)    # every 100
@@ -152,61 +408,213 @@ def add_coordinate_grid(img: Image.Image) -> Image.Image:
     return g
 
 
+def make_grid_copy(img: Image.Image, grid_max_side: int, path: Path) -> None:
+    """Downscale to `grid_max_side` (0 = full size), overlay the grid, save."""
+    if grid_max_side and max(img.size) > grid_max_side:
+        scale = grid_max_side / max(img.size)
+        img = img.resize((round(img.width * scale), round(img.height * scale)), Image.LANCZOS)
+    save_view_png(add_coordinate_grid(img), path)
+
+
+def write_page_outputs(page, clean_path: Path, grid_path: Optional[Path],
+                       grid_max_side: int = GRID_MAX_SIDE,
+                       cache_path: Optional[Path] = None) -> Dict:
+    """Write one rendered page (a cached PNG path or a fresh image) plus its grid
+    copy. Pure Pillow/file work, so it runs on a worker thread while the main
+    thread keeps PyMuPDF busy rendering the next page (PyMuPDF is not thread-safe).
+
+    A fresh image is encoded once, into `cache_path` when caching, and the grid
+    is drawn from memory. The grid copy is cached beside the page too, so a
+    rerun only copies files: no decode, no grid drawing, no PNG encode."""
+    if isinstance(page, Path):
+        cache_path = page
+        with Image.open(page) as im:   # header only
+            size = im.size
+        img = None
+    else:
+        img = page
+        size = img.size
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = _tmp_path(cache_path)
+            img.save(tmp, "PNG")
+            os.replace(tmp, cache_path)
+        else:
+            img.save(clean_path, "PNG")
+    if cache_path is not None:
+        shutil.copyfile(cache_path, clean_path)
+    entry = {"clean": str(clean_path), "width": size[0], "height": size[1]}
+    if grid_path is not None:
+        if cache_path is None:
+            make_grid_copy(img, grid_max_side, grid_path)
+        else:
+            cached_grid = cache_path.with_name(
+                f"{cache_path.stem}_grid{grid_max_side}_v{GRID_CACHE_VERSION}.png")
+            if not cached_grid.exists():
+                tmp = _tmp_path(cached_grid)
+                if img is not None:
+                    make_grid_copy(img, grid_max_side, tmp)
+                else:
+                    with Image.open(page) as im:
+                        make_grid_copy(im.convert("RGB"), grid_max_side, tmp)
+                os.replace(tmp, cached_grid)
+            shutil.copyfile(cached_grid, grid_path)
+        entry["grid"] = str(grid_path)
+    return entry
+
+
+def copy_page_outputs(source: Future, clean_path: Path, grid_path: Optional[Path]) -> Dict:
+    """Reuse the files another figure in this batch already wrote for the same
+    page. `source` is always submitted earlier, so the FIFO pool cannot deadlock."""
+    src = source.result()
+    if src["clean"] == str(clean_path):
+        # Two names that sanitize to the same file name: the files are already there.
+        return dict(src)
+    shutil.copyfile(src["clean"], clean_path)
+    entry = dict(src, clean=str(clean_path))
+    if grid_path is not None:
+        shutil.copyfile(src["grid"], grid_path)
+        entry["grid"] = str(grid_path)
+    return entry
+
+
 def main():
     ap = argparse.ArgumentParser(description="Locate + render PDF figure pages (no API)")
     ap.add_argument("pdf_path")
-    ap.add_argument("figure_name", help='e.g. "Figure 1", "Table 2", "Figure 3(a)"')
+    ap.add_argument("figure_names", nargs="*", metavar="figure_name",
+                    help='e.g. "Figure 1", "Table 2", "Figure 3(a)"; pass several to batch them')
+    ap.add_argument("--from-content", metavar="PPT_CONTENT_MD",
+                    help="also locate every figure listed under **配图**: in this ppt_content.md")
     ap.add_argument("-d", "--output-dir", default="pages", help="dir for rendered pages")
     ap.add_argument("--dpi", type=int, default=200, help="render DPI (default 200; use 300 for dense figures)")
     ap.add_argument("--max-pages", type=int, default=2,
                     help="max candidate pages to render (default 2)")
     ap.add_argument("--no-grid", action="store_true", help="skip the coordinate-grid copy")
+    ap.add_argument("--grid-max-side", type=int, default=GRID_MAX_SIDE,
+                    help=f"longest side of the grid copy in px (default {GRID_MAX_SIDE}; 0 = full size)")
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR),
+                    help=f"rendered-page cache root (default {DEFAULT_CACHE_DIR})")
+    ap.add_argument("--no-cache", action="store_true", help="always re-render, bypass the page cache")
+    ap.add_argument("--cache-max-mb", type=int, default=CACHE_MAX_MB,
+                    help=f"evict least-recently-used PDFs beyond this cache size (default {CACHE_MAX_MB})")
+    ap.add_argument("--json", action="store_true",
+                    help="print only one RESULT_JSON line per figure, no human log")
+    ap.add_argument("--workers", type=int, default=4,
+                    help="threads for grid drawing + PNG encoding (default 4)")
     args = ap.parse_args()
 
     if not os.path.exists(args.pdf_path):
         print(f"Error: PDF not found: {args.pdf_path}")
         sys.exit(1)
 
+    figure_names = list(dict.fromkeys(args.figure_names))   # a name passed twice is one job
+    if args.from_content:
+        if not os.path.exists(args.from_content):
+            print(f"Error: content file not found: {args.from_content}")
+            sys.exit(1)
+        figure_names += [n for n in figures_from_content(args.from_content)
+                         if n not in figure_names]
+    if not figure_names:
+        ap.error("give at least one figure_name or --from-content")
+
     out_dir = Path(args.output_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    doc = fitz.open(args.pdf_path)
+    try:
+        doc = fitz.open(args.pdf_path)
+    except RuntimeError as e:   # fitz.FileDataError / EmptyFileError
+        print(f"Error: cannot open PDF (damaged or not a PDF): {args.pdf_path}\n  {e}")
+        sys.exit(1)
+    if doc.needs_pass:
+        # Text scan and rendering would both fail mid-way with "document closed or encrypted".
+        doc.close()
+        print(f"Error: PDF is password-protected: {args.pdf_path}")
+        print("Save an unlocked copy of it and re-run on that.")
+        sys.exit(1)
     total_pages = len(doc)
-    doc.close()
-
-    candidates = detect_candidate_pages(args.pdf_path, args.figure_name)
-    fallback = not candidates
-    if fallback:
-        # No text layer / not found: hand back the first chunk of pages to scan.
-        candidates = list(range(min(total_pages, max(args.max_pages, 4))))
-
-    pages_to_render = candidates[: args.max_pages]
-    safe = re.sub(r"[^\w\-_\(\)]", "_", args.figure_name)
-
-    rendered = []
-    for p in pages_to_render:
-        img = render_page(args.pdf_path, p, args.dpi)
-        clean_path = out_dir / f"_{safe}_p{p + 1}.png"
-        img.save(clean_path, "PNG")
-        entry = {"page": p + 1, "clean": str(clean_path),
-                 "width": img.width, "height": img.height}
-        if not args.no_grid:
-            grid_path = out_dir / f"_{safe}_p{p + 1}_grid.png"
-            add_coordinate_grid(img).save(grid_path, "PNG")
-            entry["grid"] = str(grid_path)
-        rendered.append(entry)
-
-    print(f"[locate] figure='{args.figure_name}'  total_pages={total_pages}")
-    print(f"[locate] candidate pages (1-indexed): {[p + 1 for p in candidates]}"
-          + ("  (FALLBACK: no text hit, scan these)" if fallback else ""))
-    for e in rendered:
-        print(f"  page {e['page']}: {e['width']}x{e['height']}px")
-        print(f"    clean (crop from this): {e['clean']}")
-        if "grid" in e:
-            print(f"    grid  (read coords from this): {e['grid']}")
-
-    print("\nRESULT_JSON " + json.dumps(
-        {"figure": args.figure_name, "fallback": fallback, "pages": rendered}))
+
+    cache_dir: Optional[Path] = None
+    if not args.no_cache:
+        cache_dir = Path(args.cache_dir) / pdf_fingerprint(args.pdf_path) / str(args.dpi)
+
+    # Figures are independent: render every figure's pages on this thread and
+    # hand the encoding to the pool, then report once everything is written.
+    # Pages shared by several figures are rendered and encoded only once, and
+    # each page's text and layout are extracted only once for the whole batch.
+    jobs = []
+    page_jobs: Dict[int, Future] = {}
+    layouts: Dict[int, Dict] = {}
+    # A queued job holds its decoded full-resolution page (~25 MB at 300 dpi) until
+    # a worker gets to it, so cap the backlog instead of rendering ahead of the pool.
+    workers = max(1, args.workers)
+    pending: Deque[Future] = deque()
+    # The document is opened once for the whole batch and only touched on this thread.
+    with doc, ThreadPoolExecutor(max_workers=workers) as pool:
+        page_texts = [page.get_text() for page in doc]
+        for figure_name in figure_names:
+            candidates = detect_candidate_pages(args.pdf_path, figure_name, page_texts=page_texts)
+            fallback = not candidates
+            if fallback:
+                # No text layer / not found: hand back the first chunk of pages to scan.
+                candidates = list(range(min(total_pages, max(args.max_pages, 4))))
+
+            safe = _RE_UNSAFE_NAME.sub("_", figure_name)
+            caption_pattern = build_caption_pattern(figure_name)
+            for p in candidates if not fallback else candidates[: args.max_pages]:
+                if p not in layouts:
+                    layouts[p] = page_layout(doc[p])
+            if not fallback:
+                candidates = rank_candidate_pages(layouts, candidates, caption_pattern)
+            futures = []
+            for p in candidates[: args.max_pages]:
+                clean_path = out_dir / f"_{safe}_p{p + 1}.png"
+                grid_path = None if args.no_grid else out_dir / f"_{safe}_p{p + 1}_grid.png"
+                if p in page_jobs:
+                    fut = pool.submit(copy_page_outputs, page_jobs[p], clean_path, grid_path)
+                else:
+                    while len(pending) >= 2 * workers:
+                        pending.popleft().result()
+                    cache_path = None if cache_dir is None else cache_dir / f"p{p + 1}.png"
+                    if cache_path is not None and cache_path.exists():
+                        page = cache_path
+                    else:
+                        page = render_page(args.pdf_path, p, args.dpi, doc)
+                    fut = page_jobs[p] = pool.submit(write_page_outputs, page, clean_path, grid_path,
+                                                     args.grid_max_side, cache_path)
+                    pending.append(fut)
+                futures.append((p, fut, page_layout_hints(layouts[p], caption_pattern)))
+            jobs.append((figure_name, candidates, fallback, futures))
+
+    if cache_dir is not None:
+        pdf_cache = cache_dir.parent
+        if pdf_cache.is_dir():
+            os.utime(pdf_cache)   # mark as recently used for eviction
+        prune_cache(pdf_cache.parent, args.cache_max_mb, keep=pdf_cache)
+
+    for idx, (figure_name, candidates, fallback, futures) in enumerate(jobs):
+        rendered = [{"page": p + 1, **f.result(), **hints} for p, f, hints in futures]
+        result = {"figure": figure_name, "fallback": fallback, "pages": rendered}
+        if args.json:
+            print("RESULT_JSON " + json.dumps(result, separators=(",", ":")))
+            continue
+        if idx:
+            print()
+        print(f"[locate] figure='{figure_name}'  total_pages={total_pages}")
+        print(f"[locate] candidate pages (1-indexed): {[p + 1 for p in candidates]}"
+              + ("  (FALLBACK: no text hit, scan these)" if fallback else ""))
+        for e in rendered:
+            print(f"  page {e['page']}: {e['width']}x{e['height']}px")
+            print(f"    clean (crop from this): {e['clean']}")
+            if "grid" in e:
+                print(f"    grid  (read coords from this): {e['grid']}")
+            if e["caption"]:
+                print(f"    caption block (0-1000): {e['caption']}")
+            if e["graphics"]:
+                print(f"    graphics (0-1000): {e['graphics']}")
+            if e["suggested"]:
+                print(f"    suggested bbox (caption + adjacent graphics): {e['suggested']}")
+
+        print("\nRESULT_JSON " + json.dumps(result))
 
 
 if __name__ == "__main__":